@@ -1,6 +1,126 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models import *
 
-@admin.register(Category, Product, Variant, Sale, Order, InventoryAudit)
-class InventoryAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Use the Postgres planner estimate instead of COUNT(*) for unfiltered
+    changelists on large tables. Filtered lists and other backends count
+    as usual.
+    """
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.threshold:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class StockAdjustmentForm(ActionForm):
+    adjustment = forms.IntegerField(required=False, help_text="Units to add (negative to remove)")
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    search_fields = ['name']
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'price', 'user', 'updated_at']
+    list_select_related = ['category', 'user']
+    list_filter = ['category']
+    search_fields = ['name']
+    autocomplete_fields = ['category']
+    raw_id_fields = ['user']
+
+
+@admin.register(Variant)
+class VariantAdmin(LargeTableAdmin):
+    list_display = ['variant_name', 'sku', 'product', 'size', 'color', 'stock_quantity', 'reorder_threshold']
+    list_select_related = ['product__category']
+    search_fields = ['sku', 'variant_name']
+    autocomplete_fields = ['product']
+    raw_id_fields = ['last_updated_by']
+    action_form = StockAdjustmentForm
+    actions = ['adjust_stock']
+
+    @admin.action(description="Adjust stock of selected variants")
+    def adjust_stock(self, request, queryset):
+        adjustment = request.POST.get('adjustment')
+        try:
+            adjustment = int(adjustment)
+        except (TypeError, ValueError):
+            self.message_user(request, "Adjustment must be an integer", messages.ERROR)
+            return
+        try:
+            count = queryset.adjust_stock(adjustment, user=request.user, reason="Admin bulk adjustment")
+        except ValidationError as e:
+            self.message_user(request, "; ".join(e.messages), messages.ERROR)
+            return
+        self.message_user(request, f"Adjusted stock of {count} variants by {adjustment}")
+
+
+@admin.register(InventoryAudit)
+class InventoryAuditAdmin(LargeTableAdmin):
+    list_display = ['timestamp', 'variant', 'user', 'old_quantity', 'new_quantity', 'change_reason']
+    list_select_related = ['variant', 'user']
+    raw_id_fields = ['variant', 'user']
+
+
+@admin.register(Sale)
+class SaleAdmin(LargeTableAdmin):
+    list_display = ['__str__', 'variant', 'quantity_sold', 'total_price', 'sold_by', 'sale_date']
+    list_select_related = ['variant', 'sold_by']
+    raw_id_fields = ['variant', 'sold_by']
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'customer_name', 'status', 'created_by', 'created_at']
+    list_select_related = ['product', 'created_by']
+    list_filter = ['status']
+    autocomplete_fields = ['product']
+    raw_id_fields = ['created_by']
+
+
+@admin.register(InventoryAuditArchive)
+class InventoryAuditArchiveAdmin(LargeTableAdmin):
+    list_display = ['timestamp', 'variant', 'user', 'old_quantity', 'new_quantity', 'change_reason']
+    list_select_related = ['variant', 'user']
+    raw_id_fields = ['variant', 'user']
+
+
+@admin.register(SaleArchive)
+class SaleArchiveAdmin(LargeTableAdmin):
+    list_display = ['__str__', 'variant', 'quantity_sold', 'total_price', 'sold_by', 'sale_date']
+    list_select_related = ['variant', 'sold_by']
+    raw_id_fields = ['variant', 'sold_by']
+
+
+@admin.register(DailyHistoryRollup)
+class DailyHistoryRollupAdmin(LargeTableAdmin):
+    list_display = ['day', 'variant', 'units_sold', 'revenue', 'sale_count', 'stock_changes', 'net_stock_change']
+    list_select_related = ['variant']
+    raw_id_fields = ['variant']
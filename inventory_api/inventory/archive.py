@@ -0,0 +1,147 @@
+"""
+Retention for InventoryAudit and Sale history.
+
+Rows older than a cutoff are moved out of the hot tables in primary-key
+chunks, each chunk in its own transaction: the rows are copied to an
+archive table or a compressed file, folded into DailyHistoryRollup, then
+deleted from the hot table. A crashed run can simply be repeated.
+"""
+import csv
+import gzip
+from datetime import datetime, time
+from decimal import Decimal
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+AUDIT_FIELDS = ['id', 'variant_id', 'user_id', 'old_quantity', 'new_quantity', 'timestamp', 'change_reason']
+SALE_FIELDS = ['id', 'variant_id', 'quantity_sold', 'sale_date', 'total_price', 'sold_by_id']
+
+
+def cutoff_datetime(day):
+    """Start of ``day`` in the current timezone, the exclusive archive bound"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _write_file(rows, fields, directory, fmt):
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{rows[0]['id']}-{rows[-1]['id']}"
+    if fmt == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pylist(rows), directory / f"{stem}.parquet", compression='zstd')
+        return
+    with gzip.open(directory / f"{stem}.csv.gz", 'wt', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _fold_into_rollups(summaries):
+    """Add per (variant, day) deltas onto DailyHistoryRollup rows"""
+    from .models import DailyHistoryRollup
+
+    existing = {}
+    variant_ids = {variant_id for variant_id, _ in summaries}
+    days = {day for _, day in summaries}
+    for rollup in DailyHistoryRollup.objects.filter(variant_id__in=variant_ids, day__in=days):
+        existing[(rollup.variant_id, rollup.day)] = rollup
+
+    fields = ['units_sold', 'revenue', 'sale_count', 'stock_changes', 'net_stock_change']
+    to_create, to_update = [], []
+    for (variant_id, day), delta in summaries.items():
+        rollup = existing.get((variant_id, day))
+        if rollup is None:
+            to_create.append(DailyHistoryRollup(variant_id=variant_id, day=day, **delta))
+            continue
+        for field, value in delta.items():
+            setattr(rollup, field, getattr(rollup, field) + value)
+        to_update.append(rollup)
+    DailyHistoryRollup.objects.bulk_create(to_create)
+    DailyHistoryRollup.objects.bulk_update(to_update, fields)
+
+
+def _summarize(rows, date_field, accumulate):
+    summaries = {}
+    for row in rows:
+        key = (row['variant_id'], timezone.localdate(row[date_field]))
+        delta = summaries.setdefault(key, {
+            'units_sold': 0, 'revenue': Decimal('0'), 'sale_count': 0,
+            'stock_changes': 0, 'net_stock_change': 0,
+        })
+        accumulate(delta, row)
+    return summaries
+
+
+def _accumulate_audit(delta, row):
+    delta['stock_changes'] += 1
+    delta['net_stock_change'] += row['new_quantity'] - row['old_quantity']
+
+
+def _accumulate_sale(delta, row):
+    delta['units_sold'] += row['quantity_sold']
+    delta['revenue'] += row['total_price']
+    delta['sale_count'] += 1
+
+
+def _archive(model, archive_model, fields, date_field, accumulate, before,
+             chunk_size, output_dir, fmt):
+    cutoff = cutoff_datetime(before)
+    directory = Path(output_dir) / model._meta.model_name if output_dir else None
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                model.objects.filter(**{f'{date_field}__lt': cutoff})
+                .order_by('pk').values(*fields)[:chunk_size]
+            )
+            if not rows:
+                return moved
+            if directory is not None:
+                _write_file(rows, fields, directory, fmt)
+            else:
+                archive_model.objects.bulk_create(
+                    [archive_model(**row) for row in rows], ignore_conflicts=True
+                )
+            _fold_into_rollups(_summarize(rows, date_field, accumulate))
+            model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+
+
+def archive_audits(before, chunk_size=5000, output_dir=None, fmt='csv'):
+    """Move InventoryAudit rows older than ``before``; returns the row count"""
+    from .models import InventoryAudit, InventoryAuditArchive
+    return _archive(InventoryAudit, InventoryAuditArchive, AUDIT_FIELDS, 'timestamp',
+                    _accumulate_audit, before, chunk_size, output_dir, fmt)
+
+
+def archive_sales(before, chunk_size=5000, output_dir=None, fmt='csv'):
+    """Move Sale rows older than ``before``; returns the row count"""
+    from .models import Sale, SaleArchive
+    return _archive(Sale, SaleArchive, SALE_FIELDS, 'sale_date',
+                    _accumulate_sale, before, chunk_size, output_dir, fmt)
+
+
+def create_range_indexes(schema_editor):
+    """
+    On Postgres, give the append-only archive tables BRIN indexes on their
+    time column so date-range scans skip unrelated blocks.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX inventory_inventoryauditarchive_ts_brin "
+        "ON inventory_inventoryauditarchive USING BRIN (timestamp)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX inventory_salearchive_date_brin "
+        "ON inventory_salearchive USING BRIN (sale_date)"
+    )
+
+
+def drop_range_indexes(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS inventory_inventoryauditarchive_ts_brin")
+    schema_editor.execute("DROP INDEX IF EXISTS inventory_salearchive_date_brin")
@@ -0,0 +1,114 @@
+"""
+Single-flight coalescing for hot read endpoints.
+
+Concurrent identical reads in one process share a single execution: the
+first request runs the query and serializes the result, later arrivals
+wait for it and reuse the same payload.
+"""
+import threading
+from collections import Counter
+
+from rest_framework.response import Response
+
+
+class HotReadMetrics:
+    """Per-process counters of executed, coalesced and throttled reads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def incr(self, scope, event):
+        with self._lock:
+            self._counts[(scope, event)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        result = {}
+        for (scope, event), n in counts.items():
+            result.setdefault(scope, {'executed': 0, 'coalesced': 0, 'throttled': 0})[event] = n
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = HotReadMetrics()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run ``fn`` unless an identical call is already in flight, in which
+        case wait for and share its result. Returns ``(result, shared)``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+flight = SingleFlight()
+
+
+class CoalescedReadMixin:
+    """
+    Coalesce concurrent identical list/retrieve requests, keyed by endpoint
+    and full path. Views whose queryset depends on the requesting user
+    keep ``coalesce_per_user`` so the key also includes the user; views
+    serving the same rows to everyone turn it off and share across users.
+    """
+    coalesce_per_user = True
+
+    def list(self, request, *args, **kwargs):
+        return self._coalesce(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._coalesce(request, super().retrieve, *args, **kwargs)
+
+    def _coalesce(self, request, handler, *args, **kwargs):
+        scope = getattr(self, 'throttle_scope', self.basename)
+        user = request.user.pk if self.coalesce_per_user else None
+        key = (scope, self.action, user, request.get_full_path())
+
+        def read():
+            response = handler(request, *args, **kwargs)
+            return response.data, response.status_code
+
+        (data, status), shared = flight.do(key, read)
+        metrics.incr(scope, 'coalesced' if shared else 'executed')
+        return Response(data, status=status)
@@ -0,0 +1,141 @@
+"""
+Demand forecasting over per-SKU sales history.
+
+Daily sales are pulled one batch of SKUs at a time as a dense
+``(n_skus, n_days)`` NumPy matrix, and every forecast method works on the
+whole matrix at once. Models are imported lazily so pool workers can
+import this module without a configured Django.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import connections
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def load_daily_sales(variant_ids, start_date, days):
+    """
+    Return a ``(len(variant_ids), days)`` matrix of units sold per day,
+    starting at ``start_date``. Live sales come from one grouped query on
+    Sale, and days whose sales archive_history already moved out come from
+    DailyHistoryRollup. Rows move from one table to the other atomically,
+    so adding both never double counts.
+    """
+    from .models import DailyHistoryRollup, Sale
+    variant_ids = np.asarray(variant_ids, dtype=np.int64)
+    history = np.zeros((len(variant_ids), days), dtype=np.float64)
+    end_date = start_date + timedelta(days=days)
+    # Bound on aware datetimes, not __date, so the sale_date index is usable
+    live = Sale.objects.filter(
+        variant_id__in=variant_ids.tolist(),
+        sale_date__gte=_start_of_day(start_date),
+        sale_date__lt=_start_of_day(end_date),
+    ).annotate(day=TruncDate('sale_date')).order_by().values_list(
+        'variant_id', 'day'
+    ).annotate(quantity=Sum('quantity_sold'))
+    archived = DailyHistoryRollup.objects.filter(
+        variant_id__in=variant_ids.tolist(),
+        day__gte=start_date,
+        day__lt=end_date,
+        units_sold__gt=0,
+    ).values_list('variant_id', 'day', 'units_sold')
+
+    rows = list(live) + list(archived)
+    if not rows:
+        return history
+
+    sku, day, quantity = zip(*rows)
+    start = start_date.toordinal()
+    order = np.argsort(variant_ids)
+    row_index = order[np.searchsorted(variant_ids, sku, sorter=order)]
+    day_index = np.fromiter((d.toordinal() - start for d in day), dtype=np.int64, count=len(day))
+    np.add.at(history, (row_index, day_index), np.asarray(quantity, dtype=np.float64))
+    return history
+
+
+def moving_average(history, window):
+    """Mean daily demand over the trailing ``window`` days for every SKU"""
+    return history[:, -window:].mean(axis=1)
+
+
+def exponential_smoothing(history, alpha):
+    """
+    Simple exponential smoothing level for every SKU. The recurrence
+    ``level = alpha * x + (1 - alpha) * level`` is unrolled into one weight
+    vector so the whole matrix is reduced with a single product.
+    """
+    days = history.shape[1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return history @ weights
+
+
+def compute_forecasts(history, window, alpha):
+    return moving_average(history, window), exponential_smoothing(history, alpha)
+
+
+def recompute_forecasts(history_days=90, window=28, alpha=0.3, horizon_days=30,
+                        batch_size=5000, workers=None):
+    """
+    Recompute forecasts for every variant and upsert them into
+    DemandForecast. With ``workers`` the NumPy work is handed to a process
+    pool while the next batch is loaded, keeping at most two batches per
+    worker in flight and storing each as soon as it completes; only the
+    main process talks to the database. Returns the number of variants forecast.
+    """
+    from .models import DemandForecast, Variant
+    today = timezone.localdate()
+    start_date = today - timedelta(days=history_days)
+    variant_ids = list(Variant.objects.order_by('pk').values_list('pk', flat=True))
+    batches = [variant_ids[i:i + batch_size] for i in range(0, len(variant_ids), batch_size)]
+
+    def store(ids, results):
+        averages, levels = results
+        generated_at = timezone.now()
+        DemandForecast.objects.bulk_create(
+            [
+                DemandForecast(
+                    variant_id=pk,
+                    moving_average=float(avg),
+                    smoothed=float(level),
+                    horizon_days=horizon_days,
+                    forecast_quantity=float(level) * horizon_days,
+                    generated_at=generated_at,
+                )
+                for pk, avg, level in zip(ids, averages, levels)
+            ],
+            update_conflicts=True,
+            unique_fields=['variant'],
+            update_fields=['moving_average', 'smoothed', 'horizon_days',
+                           'forecast_quantity', 'generated_at'],
+        )
+
+    if not workers or workers < 2:
+        for ids in batches:
+            history = load_daily_sales(ids, start_date, history_days)
+            store(ids, compute_forecasts(history, window, alpha))
+        return len(variant_ids)
+
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, ids in enumerate(batches):
+            history = load_daily_sales(ids, start_date, history_days)
+            if i == 0:
+                # Forked workers all start at the first submit and must not
+                # inherit the open database connection
+                connections.close_all()
+            in_flight[pool.submit(compute_forecasts, history, window, alpha)] = ids
+            if len(in_flight) >= workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    store(in_flight.pop(future), future.result())
+        for future in as_completed(in_flight):
+            store(in_flight[future], future.result())
+    return len(variant_ids)
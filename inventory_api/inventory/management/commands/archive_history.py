@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.archive import archive_audits, archive_sales
+
+
+class Command(BaseCommand):
+    help = "Move InventoryAudit and Sale rows older than a date out of the hot tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True,
+                            help="Archive rows dated before this day (YYYY-MM-DD)")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--only', choices=['audits', 'sales'],
+                            help="Archive a single history table")
+        parser.add_argument('--output-dir',
+                            help="Write compressed files here instead of the archive tables")
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                            help="File format used with --output-dir")
+
+    def handle(self, *args, **options):
+        try:
+            before = date.fromisoformat(options['before'])
+        except ValueError:
+            raise CommandError("--before must be a date in YYYY-MM-DD format")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+        if options['output_dir'] and options['format'] == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise CommandError("Parquet output requires pyarrow")
+
+        kwargs = {
+            'chunk_size': options['chunk_size'],
+            'output_dir': options['output_dir'],
+            'fmt': options['format'],
+        }
+        if options['only'] != 'sales':
+            count = archive_audits(before, **kwargs)
+            self.stdout.write(f"Archived {count} inventory audit rows")
+        if options['only'] != 'audits':
+            count = archive_sales(before, **kwargs)
+            self.stdout.write(f"Archived {count} sale rows")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.forecast import recompute_forecasts
+
+
+class Command(BaseCommand):
+    help = "Recompute demand forecasts for every variant from sales history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-days', type=int, default=90)
+        parser.add_argument('--window', type=int, default=28,
+                            help="Trailing days for the moving average")
+        parser.add_argument('--alpha', type=float, default=0.3,
+                            help="Exponential smoothing factor")
+        parser.add_argument('--horizon-days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Spread the NumPy work over a process pool")
+
+    def handle(self, *args, **options):
+        if options['history_days'] < 1:
+            raise CommandError("--history-days must be positive")
+        if options['horizon_days'] < 0:
+            raise CommandError("--horizon-days cannot be negative")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers must be positive")
+        if not 0 < options['alpha'] <= 1:
+            raise CommandError("--alpha must be in (0, 1]")
+        if not 0 < options['window'] <= options['history_days']:
+            raise CommandError("--window must be between 1 and --history-days")
+        count = recompute_forecasts(
+            history_days=options['history_days'],
+            window=options['window'],
+            alpha=options['alpha'],
+            horizon_days=options['horizon_days'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Forecast {count} variants"))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inventory.search import build_document, create_index, drop_index
+
+
+def add_search_index(apps, schema_editor):
+    create_index(schema_editor)
+
+
+def remove_search_index(apps, schema_editor):
+    drop_index(schema_editor)
+
+
+def backfill_documents(apps, schema_editor):
+    Variant = apps.get_model('inventory', 'Variant')
+    SearchDocument = apps.get_model('inventory', 'SearchDocument')
+    rows = Variant.objects.values_list(
+        'pk', 'product__name', 'product__description', 'color', 'size', 'sku'
+    ).order_by('pk')
+    batch = []
+    for pk, name, description, color, size, sku in rows.iterator(chunk_size=2000):
+        batch.append(SearchDocument(
+            variant_id=pk, body=build_document(name, description, color, size, sku)
+        ))
+        if len(batch) >= 2000:
+            SearchDocument.objects.bulk_create(batch)
+            batch = []
+    SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('variant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='inventory.variant')),
+                ('body', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
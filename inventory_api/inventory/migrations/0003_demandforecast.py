@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('variant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='inventory.variant')),
+                ('moving_average', models.FloatField(help_text='Mean daily units over the trailing window')),
+                ('smoothed', models.FloatField(help_text='Exponentially smoothed daily units')),
+                ('horizon_days', models.PositiveIntegerField()),
+                ('forecast_quantity', models.FloatField(help_text='Expected units sold over the horizon')),
+                ('generated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_demandforecast'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventoryaudit',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='sale_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
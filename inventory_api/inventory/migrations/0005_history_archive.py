@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from inventory.archive import create_range_indexes, drop_range_indexes
+
+
+def add_range_indexes(apps, schema_editor):
+    create_range_indexes(schema_editor)
+
+
+def remove_range_indexes(apps, schema_editor):
+    drop_range_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_history_timestamp_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryAuditArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('old_quantity', models.IntegerField()),
+                ('new_quantity', models.IntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('change_reason', models.CharField(blank=True, max_length=200)),
+                ('user', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('variant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.variant')),
+            ],
+            options={
+                'verbose_name': 'Archived Inventory Change Log',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity_sold', models.PositiveIntegerField()),
+                ('sale_date', models.DateTimeField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sold_by', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('variant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.variant')),
+            ],
+            options={
+                'ordering': ['-sale_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyHistoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sale_count', models.PositiveIntegerField(default=0)),
+                ('stock_changes', models.PositiveIntegerField(default=0)),
+                ('net_stock_change', models.IntegerField(default=0)),
+                ('variant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.variant')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('variant', 'day')},
+            },
+        ),
+        migrations.RunPython(add_range_indexes, remove_range_indexes),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+import django.db.models.deletion
+import inventory.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_history_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyhistoryrollup',
+            name='variant',
+            field=models.ForeignKey(db_constraint=False, on_delete=inventory.models.protect_archived_sales, related_name='+', to='inventory.variant'),
+        ),
+        migrations.AlterField(
+            model_name='inventoryauditarchive',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='inventoryauditarchive',
+            name='variant',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.variant'),
+        ),
+        migrations.AlterField(
+            model_name='salearchive',
+            name='sold_by',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='salearchive',
+            name='variant',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='inventory.variant'),
+        ),
+    ]
@@ -1,12 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.conf import settings
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from django.db.models import Count
+from django.db.models import Count, F, ProtectedError
 from django.contrib.auth.models import User
+from .search import PRODUCT_SEARCH_FIELDS, index_product, index_variant, search_fields_changed
 
 class CategoryManager(models.Manager):
     def with_product_counts(self):
@@ -55,6 +56,35 @@ class Product(models.Model):
             ("low_stock_alerts", "Can view low stock alerts"),
         ]
 
+class VariantQuerySet(models.QuerySet):
+    def adjust_stock(self, adjustment, user=None, reason="Manual adjustment"):
+        """
+        Set-based stock adjustment: one UPDATE for every selected variant
+        plus one bulk INSERT of audit rows, instead of a save() per row.
+        Returns the number of variants adjusted.
+        """
+        with transaction.atomic():
+            rows = list(self.select_for_update().values_list('pk', 'stock_quantity'))
+            if any(quantity + adjustment < 0 for _, quantity in rows):
+                raise ValidationError("Stock quantity cannot be negative")
+            pks = [pk for pk, _ in rows]
+            for i in range(0, len(pks), 1000):
+                Variant.objects.filter(pk__in=pks[i:i + 1000]).update(
+                    stock_quantity=F('stock_quantity') + adjustment,
+                    last_updated_by=user
+                )
+            InventoryAudit.objects.bulk_create([
+                InventoryAudit(
+                    variant_id=pk,
+                    user=user,
+                    old_quantity=quantity,
+                    new_quantity=quantity + adjustment,
+                    change_reason=reason
+                )
+                for pk, quantity in rows
+            ], batch_size=1000)
+        return len(rows)
+
 class Variant(models.Model):
     """Product variants with size/color options"""
     product = models.ForeignKey(
@@ -74,6 +104,7 @@ class Variant(models.Model):
         null=True,
         blank=True
     )
+    objects = VariantQuerySet.as_manager()
 
     def clean(self):
         """Validate stock and threshold values"""
@@ -119,7 +150,7 @@ class InventoryAudit(models.Model):
     )
     old_quantity = models.IntegerField()
     new_quantity = models.IntegerField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     change_reason = models.CharField(max_length=200, blank=True)
 
     class Meta:
@@ -137,7 +168,7 @@ class Sale(models.Model):
         related_name='sales'
     )
     quantity_sold = models.PositiveIntegerField()
-    sale_date = models.DateTimeField(auto_now_add=True)
+    sale_date = models.DateTimeField(auto_now_add=True, db_index=True)
     total_price = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -197,10 +228,131 @@ class Order(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+def protect_archived_sales(collector, field, sub_objs, using):
+    """
+    on_delete for DailyHistoryRollup: rows summarizing sales PROTECT the
+    variant like Sale does, audit-only rows CASCADE like InventoryAudit.
+    """
+    with_sales = [rollup for rollup in sub_objs if rollup.sale_count > 0]
+    if with_sales:
+        raise ProtectedError(
+            f"Cannot delete some instances of model '{field.remote_field.model.__name__}' "
+            f"because they have archived sales in '{field.model.__name__}.{field.name}'",
+            set(with_sales)
+        )
+    models.CASCADE(collector, field, sub_objs, using)
+
+class InventoryAuditArchive(models.Model):
+    """Cold InventoryAudit rows moved out by archive_history"""
+    id = models.BigIntegerField(primary_key=True)
+    variant = models.ForeignKey(
+        Variant,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        null=True,
+        related_name='+'
+    )
+    old_quantity = models.IntegerField()
+    new_quantity = models.IntegerField()
+    timestamp = models.DateTimeField()
+    change_reason = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        verbose_name = "Archived Inventory Change Log"
+
+    def __str__(self):
+        return f"Archived change {self.id} of variant {self.variant_id}"
+
+class SaleArchive(models.Model):
+    """Cold Sale rows moved out by archive_history"""
+    id = models.BigIntegerField(primary_key=True)
+    variant = models.ForeignKey(
+        Variant,
+        on_delete=models.PROTECT,
+        db_constraint=False,
+        related_name='+'
+    )
+    quantity_sold = models.PositiveIntegerField()
+    sale_date = models.DateTimeField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    sold_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        db_constraint=False,
+        related_name='+'
+    )
+
+    class Meta:
+        ordering = ['-sale_date']
+
+    def __str__(self):
+        return f"Archived sale #{self.id}"
+
+class DailyHistoryRollup(models.Model):
+    """Per-variant daily summary of archived sales and stock changes"""
+    variant = models.ForeignKey(
+        Variant,
+        on_delete=protect_archived_sales,
+        db_constraint=False,
+        related_name='+'
+    )
+    day = models.DateField()
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sale_count = models.PositiveIntegerField(default=0)
+    stock_changes = models.PositiveIntegerField(default=0)
+    net_stock_change = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['variant', 'day']]
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.variant_id} on {self.day}"
+
+class SearchDocument(models.Model):
+    """Denormalized full-text body for product/variant search"""
+    variant = models.OneToOneField(
+        Variant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    body = models.TextField()
+
+    def __str__(self):
+        return f"Search document for variant {self.variant_id}"
+
+class DemandForecast(models.Model):
+    """Latest per-variant demand forecast, rebuilt by recompute_forecasts"""
+    variant = models.OneToOneField(
+        Variant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='forecast'
+    )
+    moving_average = models.FloatField(help_text="Mean daily units over the trailing window")
+    smoothed = models.FloatField(help_text="Exponentially smoothed daily units")
+    horizon_days = models.PositiveIntegerField()
+    forecast_quantity = models.FloatField(help_text="Expected units sold over the horizon")
+    generated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Forecast for variant {self.variant_id}"
+
 @receiver(pre_save, sender=Variant)
 def track_inventory_change(sender, instance, **kwargs):
     if instance.pk:  # Only for updates
         old = Variant.objects.get(pk=instance.pk)
+        # Let index_variant_document skip stock-only saves without another query
+        instance._search_fields_changed = search_fields_changed(old, instance)
         if old.stock_quantity != instance.stock_quantity:
             InventoryAudit.objects.create(
                 variant=instance,
@@ -208,4 +360,17 @@ def track_inventory_change(sender, instance, **kwargs):
                 old_quantity=old.stock_quantity,
                 new_quantity=instance.stock_quantity,
                 change_reason="Manual adjustment" if not instance.sales.exists() else "Sale"
-            )
\ No newline at end of file
+            )
+
+@receiver(post_save, sender=Variant)
+def index_variant_document(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_search_fields_changed', True):
+        index_variant(instance, created=created)
+
+@receiver(post_save, sender=Product)
+def index_product_documents(sender, instance, created, update_fields=None, **kwargs):
+    if created:  # New products have no variants yet
+        return
+    if update_fields is not None and not PRODUCT_SEARCH_FIELDS & set(update_fields):
+        return
+    index_product(instance)
@@ -0,0 +1,264 @@
+import re
+
+from django.db import connection, OperationalError
+from django.db.models import BooleanField, Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'inventory_searchdocument_fts'
+FACET_SIZE = 20
+VARIANT_SEARCH_FIELDS = ('product_id', 'color', 'size', 'sku')
+PRODUCT_SEARCH_FIELDS = {'name', 'description'}
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+_fts_available = {}
+
+
+def build_document(product_name, description, color, size, sku):
+    """Flatten the searchable product/variant fields into one text body"""
+    parts = [product_name, description, color, size, sku]
+    return ' '.join(p for p in parts if p)
+
+
+def document_for_variant(variant):
+    product = variant.product
+    return build_document(
+        product.name, product.description,
+        variant.color, variant.size, variant.sku
+    )
+
+
+def search_fields_changed(old, new):
+    """Whether a variant save alters anything its search document is built from"""
+    return any(getattr(old, f) != getattr(new, f) for f in VARIANT_SEARCH_FIELDS)
+
+
+def index_variant(variant, created=False):
+    """
+    Keep the search document of a single variant current. Callers skip
+    this entirely for saves that leave VARIANT_SEARCH_FIELDS untouched.
+    """
+    from .models import SearchDocument
+    body = document_for_variant(variant)
+    if created:
+        SearchDocument.objects.create(variant_id=variant.pk, body=body)
+        return
+    SearchDocument.objects.filter(variant_id=variant.pk).exclude(body=body).update(body=body)
+
+
+def index_product(product):
+    """
+    Refresh the documents of a product's variants, rewriting only bodies
+    that actually changed so a price-only save leaves the index alone.
+    """
+    from .models import SearchDocument
+    changed = []
+    variants = product.variants.select_related('search_document').order_by()
+    for v in variants:
+        body = build_document(product.name, product.description, v.color, v.size, v.sku)
+        document = getattr(v, 'search_document', None)
+        if document is None:
+            changed.append(SearchDocument(variant_id=v.pk, body=body))
+        elif document.body != body:
+            document.body = body
+            changed.append(document)
+    SearchDocument.objects.bulk_create(
+        changed,
+        update_conflicts=True,
+        unique_fields=['variant'],
+        update_fields=['body'],
+    )
+
+
+def _has_fts_table():
+    alias = connection.alias
+    if alias not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[alias] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_available[alias]
+
+
+def _tokens(text):
+    return TOKEN_RE.findall(text)
+
+
+def _fts5_query(tokens):
+    """FTS5 query requiring every token as a word prefix"""
+    return ' '.join('"%s"*' % t for t in tokens)
+
+
+def _tsquery(tokens):
+    """Postgres to_tsquery input requiring every token as a word prefix"""
+    return ' & '.join(f"{t}:*" for t in tokens)
+
+
+def match_documents(queryset, text, ranked=False):
+    """
+    Restrict a SearchDocument queryset to rows matching ``text``.
+
+    On every backend the rule is the same: ``text`` is split into words
+    (runs of letters and digits) and a document matches when each word is
+    a prefix of some word in its body, case-insensitively, so "shirt"
+    also finds "shirts". Only the icontains fallback for SQLite builds
+    without FTS5 is looser, matching words anywhere inside the body. With
+    ``ranked`` the rows are also ordered best match first (``ts_rank`` on
+    Postgres, ``bm25()`` on FTS5), so a slice of the result is a top-N
+    query answered by the index rather than a sort over every match.
+    """
+    tokens = _tokens(text)
+    if not tokens:
+        return queryset.order_by('variant_id') if ranked else queryset
+    if connection.vendor == 'postgresql':
+        query = "to_tsquery('simple', %s)"
+        queryset = queryset.filter(RawSQL(
+            f"body_tsv @@ {query}", (_tsquery(tokens),), output_field=BooleanField()
+        ))
+        if ranked:
+            queryset = queryset.annotate(
+                rank=RawSQL(f"ts_rank(body_tsv, {query})", (_tsquery(tokens),), output_field=FloatField())
+            ).order_by('-rank')
+        return queryset
+    if connection.vendor == 'sqlite' and _has_fts_table():
+        if ranked:
+            # bm25() only works against the FTS table joined into the MATCH query
+            return queryset.extra(
+                tables=[FTS_TABLE],
+                where=[
+                    f"{FTS_TABLE}.rowid = inventory_searchdocument.variant_id",
+                    f"{FTS_TABLE} MATCH %s",
+                ],
+                params=[_fts5_query(tokens)],
+                select={'rank': f"bm25({FTS_TABLE})"},
+                order_by=['rank'],
+            )
+        return queryset.filter(variant_id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            (_fts5_query(tokens),)
+        ))
+    condition = Q()
+    for token in tokens:
+        condition &= Q(body__icontains=token)
+    queryset = queryset.filter(condition)
+    return queryset.order_by('variant_id') if ranked else queryset
+
+
+def _facet_sql(matched_sql):
+    """
+    One statement grouping the matched rows by every facet dimension
+    separately, so the result never grows with the category x color x size
+    cross-product. Postgres does it in a single pass with GROUPING SETS;
+    elsewhere the same groupings are UNION ALLed over one CTE. Each row is
+    ``(facet, category_id, category_name, value, count)``.
+    """
+    if connection.vendor == 'postgresql':
+        return (
+            f"WITH matched AS ({matched_sql}) "
+            "SELECT CASE WHEN GROUPING(category_id) = 0 THEN 'category' "
+            "WHEN GROUPING(color) = 0 THEN 'color' "
+            "WHEN GROUPING(size) = 0 THEN 'size' "
+            "WHEN GROUPING(in_stock) = 0 THEN 'in_stock' ELSE 'total' END, "
+            "category_id, category_name, "
+            "COALESCE(color, size, in_stock::text), COUNT(*) "
+            "FROM matched GROUP BY GROUPING SETS "
+            "((category_id, category_name), (color), (size), (in_stock), ())"
+        )
+    return (
+        f"WITH matched AS ({matched_sql}) "
+        "SELECT 'category', category_id, category_name, NULL, COUNT(*) "
+        "FROM matched GROUP BY category_id, category_name "
+        "UNION ALL SELECT 'color', NULL, NULL, color, COUNT(*) FROM matched GROUP BY color "
+        "UNION ALL SELECT 'size', NULL, NULL, size, COUNT(*) FROM matched GROUP BY size "
+        "UNION ALL SELECT 'in_stock', NULL, NULL, in_stock, COUNT(*) FROM matched GROUP BY in_stock "
+        "UNION ALL SELECT 'total', NULL, NULL, NULL, COUNT(*) FROM matched"
+    )
+
+
+def facet_counts(queryset, size=FACET_SIZE):
+    """
+    Compute category/color/size/in-stock facets for a SearchDocument
+    queryset in one aggregated query, keeping the ``size`` most common
+    values of each dimension. Returns ``(total, facets)``.
+    """
+    matched = queryset.order_by().values(
+        category_id=F('variant__product__category_id'),
+        category_name=F('variant__product__category__name'),
+        color=F('variant__color'),
+        size=F('variant__size'),
+        in_stock=Case(
+            When(variant__stock_quantity__gt=0, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+    )
+    sql, params = matched.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(_facet_sql(sql), params)
+        rows = cursor.fetchall()
+
+    total, in_stock = 0, 0
+    groups = {'category': [], 'color': [], 'size': []}
+    for facet, category_id, category_name, value, count in rows:
+        if facet == 'total':
+            total = count
+        elif facet == 'in_stock':
+            # Postgres hands the boolean back as text, SQLite as 0/1
+            if value in (True, 1, '1', 'true'):
+                in_stock = count
+        elif facet == 'category':
+            groups[facet].append({'id': category_id, 'name': category_name, 'count': count})
+        else:
+            groups[facet].append({'value': value, 'count': count})
+    facets = {
+        name: sorted(values, key=lambda v: -v['count'])[:size]
+        for name, values in groups.items()
+    }
+    facets['in_stock'] = [
+        {'value': True, 'count': in_stock},
+        {'value': False, 'count': total - in_stock},
+    ]
+    return total, facets
+
+
+def create_index(schema_editor):
+    """Create the backend-specific full-text index for SearchDocument"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE inventory_searchdocument ADD COLUMN body_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', body)) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX inventory_searchdocument_tsv_gin "
+            "ON inventory_searchdocument USING GIN (body_tsv)"
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body, tokenize='unicode61')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5, match_documents falls back to LIKE
+            return
+        schema_editor.execute(
+            f"CREATE TRIGGER inventory_searchdocument_ai AFTER INSERT ON inventory_searchdocument BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.variant_id, new.body); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER inventory_searchdocument_ad AFTER DELETE ON inventory_searchdocument BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.variant_id; END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER inventory_searchdocument_au AFTER UPDATE ON inventory_searchdocument BEGIN "
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = old.variant_id; "
+            f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.variant_id, new.body); END"
+        )
+
+
+def drop_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS inventory_searchdocument_tsv_gin")
+        schema_editor.execute("ALTER TABLE inventory_searchdocument DROP COLUMN IF EXISTS body_tsv")
+    elif vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS inventory_searchdocument_{trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
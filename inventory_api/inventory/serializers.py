@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Category, Product, Variant, InventoryAudit, Sale, Order
+from .models import Category, Product, Variant, InventoryAudit, Sale, Order, DemandForecast, InventoryAuditArchive
 from django.contrib.auth.models import User
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,6 +32,14 @@ class InventoryAuditSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('timestamp',)
 
+class InventoryAuditArchiveSerializer(serializers.ModelSerializer):
+    variant_sku = serializers.CharField(source='variant.sku', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = InventoryAuditArchive
+        fields = '__all__'
+
 class SaleSerializer(serializers.ModelSerializer):
     variant_sku = serializers.CharField(source='variant.sku', read_only=True)
     product_name = serializers.CharField(source='variant.product.name', read_only=True)
@@ -50,6 +58,13 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at', 'created_by')
 
+class DemandForecastSerializer(serializers.ModelSerializer):
+    variant_sku = serializers.CharField(source='variant.sku', read_only=True)
+
+    class Meta:
+        model = DemandForecast
+        fields = '__all__'
+
 class SignupSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
 
@@ -1,9 +1,405 @@
+import io
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import ProtectedError
+from django.db import connection, connections
 from django.test import TestCase
-from inventory.models import Order
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.mixins import ListModelMixin
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from inventory.archive import archive_audits, archive_sales, cutoff_datetime
+from inventory.coalescing import SingleFlight, flight, metrics
+from inventory.forecast import exponential_smoothing, moving_average, recompute_forecasts
+from inventory.models import (
+    Category, DailyHistoryRollup, DemandForecast, InventoryAudit, InventoryAuditArchive,
+    Order, Product, Sale, SaleArchive, SearchDocument, Variant
+)
+from inventory.search import facet_counts, match_documents
+from inventory.throttling import HotReadThrottle
+
+
+def make_variant(user, product_name, variant_name, color, category='General',
+                 description='', size=None, stock_quantity=0, price=10):
+    """Create a variant, reusing the category and product if they exist"""
+    category, _ = Category.objects.get_or_create(name=category)
+    product, _ = Product.objects.get_or_create(
+        name=product_name, user=user,
+        defaults={'category': category, 'description': description, 'price': price}
+    )
+    return Variant.objects.create(
+        product=product, variant_name=variant_name, color=color,
+        size=size, stock_quantity=stock_quantity
+    )
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
 
 class OrderModelTest(TestCase):
     def test_required_fields(self):
         order = Order.objects.create(
             # ... required fields ...
         )
-        self.assertIsNotNone(order.created_at)
\ No newline at end of file
+        self.assertIsNotNone(order.created_at)
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tailor', password='pass')
+        shirt = dict(category='Shirts', description='Cotton button-down', price=40)
+        make_variant(self.user, 'Oxford shirt', 'Blue M', 'Blue', size='M', stock_quantity=3, **shirt)
+        make_variant(self.user, 'Oxford shirt', 'White L', 'White', size='L', **shirt)
+        make_variant(self.user, 'Brogue', 'Tan 42', 'Tan', category='Shoes', description='Leather shoe',
+                     size='42', stock_quantity=1, price=120)
+        self.oxford = Product.objects.get(name='Oxford shirt')
+        self.client = api_client(self.user)
+
+    def test_search_with_facets(self):
+        response = self.client.get('/api/search/', {'q': 'cotton'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            {f['value']: f['count'] for f in response.data['facets']['in_stock']},
+            {True: 1, False: 1}
+        )
+        self.assertEqual(response.data['facets']['category'][0]['name'], 'Shirts')
+
+    def test_facets_in_one_query(self):
+        matched = match_documents(SearchDocument.objects.all(), 'shirt')
+        with self.assertNumQueries(1):
+            total, facets = facet_counts(matched)
+        self.assertEqual(total, 2)
+        self.assertEqual(sorted(f['value'] for f in facets['color']), ['Blue', 'White'])
+        self.assertEqual(sorted(f['value'] for f in facets['size']), ['L', 'M'])
+        self.assertEqual(facets['category'], [
+            {'id': self.oxford.category_id, 'name': 'Shirts', 'count': 2}
+        ])
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.client.get('/api/search/', {'q': 'Butt-dow'}).data['count'], 2)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'shirts'}).data['count'], 0)
+        self.assertEqual(self.client.get('/api/search/', {'q': '"*'}).data['count'], 3)
+
+    def test_results_ranked_and_limited(self):
+        make_variant(self.user, 'Smock', 'Natural', 'Natural', category='Smocks',
+                     description='Linen yoke, cotton body, long sleeves and wooden buttons')
+        make_variant(self.user, 'Tunic', 'Natural', 'Natural', category='Smocks', description='Linen linen')
+
+        response = self.client.get('/api/search/', {'q': 'linen', 'limit': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([v['product_name'] for v in response.data['results']], ['Tunic'])
+
+    def test_filters(self):
+        response = self.client.get('/api/search/', {'q': 'shirt', 'color': 'Blue'})
+        self.assertEqual([v['color'] for v in response.data['results']], ['Blue'])
+        shoes = Category.objects.get(name='Shoes')
+        response = self.client.get('/api/search/', {'category': shoes.pk})
+        self.assertEqual([v['color'] for v in response.data['results']], ['Tan'])
+
+    def test_unsearchable_saves_skip_the_index(self):
+        variant = Variant.objects.get(color='Blue')
+        variant.stock_quantity = 9
+        with CaptureQueriesContext(connection) as queries:
+            variant.save()
+        self.assertFalse([q for q in queries if 'searchdocument' in q['sql']])
+
+        self.oxford.price = 45
+        with CaptureQueriesContext(connection) as queries:
+            self.oxford.save()
+        self.assertFalse([
+            q for q in queries if 'searchdocument' in q['sql'] and not q['sql'].startswith('SELECT')
+        ])
+
+        variant.color = 'Navy'
+        variant.save()
+        self.assertEqual(self.client.get('/api/search/', {'q': 'navy'}).data['count'], 1)
+
+    def test_invalid_category_rejected(self):
+        self.assertEqual(self.client.get('/api/search/', {'category': 'abc'}).status_code, 400)
+
+    def test_index_follows_product_edits(self):
+        self.oxford.description = 'Linen'
+        self.oxford.save()
+        self.assertEqual(self.client.get('/api/search/', {'q': 'cotton'}).data['count'], 0)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'linen'}).data['count'], 2)
+
+
+class ForecastTest(TestCase):
+    def test_vectorized_methods(self):
+        history = np.array([[1.0, 2.0, 3.0, 4.0], [0.0, 0.0, 0.0, 8.0]])
+        np.testing.assert_allclose(moving_average(history, 2), [3.5, 4.0])
+
+        level = history[:, 0].copy()
+        for t in range(1, history.shape[1]):
+            level = 0.5 * history[:, t] + 0.5 * level
+        np.testing.assert_allclose(exponential_smoothing(history, 0.5), level)
+
+    def test_command_rejects_bad_options(self):
+        for options in [{'batch_size': 0}, {'history_days': 0}, {'horizon_days': -1}]:
+            with self.assertRaises(CommandError):
+                call_command('recompute_forecasts', **options)
+
+    def test_recompute_and_endpoint(self):
+        user = User.objects.create_user(username='planner', password='pass')
+        variant = make_variant(user, 'Cap', 'Red', 'Red', category='Hats', stock_quantity=50)
+        sale = Sale.objects.create(variant=variant, quantity_sold=7, sold_by=user)
+        Sale.objects.filter(pk=sale.pk).update(sale_date=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(recompute_forecasts(history_days=7, window=7, alpha=0.5, workers=2), 1)
+
+        response = api_client(user).get(f'/api/variants/{variant.pk}/forecast/')
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.data['moving_average'], 1.0)
+        self.assertAlmostEqual(response.data['smoothed'], 3.5)
+
+
+    def test_pool_stores_every_batch(self):
+        user = User.objects.create_user(username='planner', password='pass')
+        for color in ['Red', 'Blue', 'Green', 'Black', 'White']:
+            make_variant(user, 'Cap', color, color, category='Hats')
+
+        with mock.patch.object(connections, 'close_all', wraps=connections.close_all) as close_all:
+            count = recompute_forecasts(history_days=7, window=7, batch_size=1, workers=2)
+        self.assertEqual(count, 5)
+        self.assertEqual(DemandForecast.objects.count(), 5)
+        close_all.assert_called_once()
+
+class AdminTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pass')
+        self.variants = [
+            make_variant(self.admin, 'Scarf', color, color, category='Accessories', stock_quantity=4)
+            for color in ('Red', 'Green', 'Blue')
+        ]
+        self.client.force_login(self.admin)
+
+    def test_audit_changelist_query_count(self):
+        Variant.objects.all().adjust_stock(1, user=self.admin)
+        with self.assertNumQueries(4):
+            response = self.client.get('/admin/inventory/inventoryaudit/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_adjust_action(self):
+        response = self.client.post('/admin/inventory/variant/', {
+            'action': 'adjust_stock',
+            'adjustment': '-3',
+            '_selected_action': [v.pk for v in self.variants[:2]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(Variant.objects.order_by('pk').values_list('stock_quantity', flat=True)),
+            [1, 1, 4]
+        )
+        self.assertEqual(InventoryAudit.objects.filter(new_quantity=1, old_quantity=4).count(), 2)
+
+    def test_bulk_adjust_rejects_negative_stock(self):
+        self.client.post('/admin/inventory/variant/', {
+            'action': 'adjust_stock',
+            'adjustment': '-5',
+            '_selected_action': [v.pk for v in self.variants],
+        })
+        self.assertFalse(Variant.objects.filter(stock_quantity__lt=4).exists())
+
+
+class HotReadTest(TestCase):
+    def setUp(self):
+        caches['throttle'].clear()
+        metrics.reset()
+
+    def test_single_flight_shares_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def slow_read():
+            calls.append(1)
+            release.wait(5)
+            return 'payload'
+
+        def request():
+            results.append(flight.do('key', slow_read))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        threads[0].start()
+        while 'key' not in flight._calls:
+            time.sleep(0.001)
+        for t in threads[1:]:
+            t.start()
+        while flight._calls['key'].waiters < 3:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(result == 'payload' for result, _ in results))
+
+    def test_category_reads_coalesce_across_users(self):
+        release = threading.Event()
+        calls = []
+        statuses = []
+
+        def slow_list(view, request, *args, **kwargs):
+            calls.append(request.user.username)
+            release.wait(5)
+            return Response([{'id': 1, 'name': 'Shirts'}])
+
+        def read(user):
+            statuses.append(api_client(user).get('/api/categories/').status_code)
+
+        users = [User.objects.create_user(username=name) for name in ('ann', 'bob')]
+        with mock.patch.object(ListModelMixin, 'list', slow_list):
+            threads = [threading.Thread(target=read, args=(user,)) for user in users]
+            threads[0].start()
+            while not flight._calls:
+                time.sleep(0.001)
+            threads[1].start()
+            while next(iter(flight._calls.values())).waiters < 1:
+                time.sleep(0.001)
+            release.set()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(calls, ['ann'])
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(metrics.snapshot()['categories'], {'executed': 1, 'coalesced': 1, 'throttled': 0})
+
+    def test_category_reads_are_throttled_and_counted(self):
+        client = api_client()
+        with mock.patch.object(HotReadThrottle, 'THROTTLE_RATES', {'categories': '2/min'}):
+            statuses = [client.get('/api/categories/').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(metrics.snapshot()['categories'], {'executed': 2, 'coalesced': 0, 'throttled': 1})
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='clerk', password='pass')
+        self.variant = make_variant(self.user, 'Belt', 'Black', 'Black', category='Leather',
+                                    stock_quantity=10, price=25)
+        for _ in range(3):
+            Sale.objects.create(variant=self.variant, quantity_sold=2, sold_by=self.user)
+        old = timezone.now() - timedelta(days=40)
+        Sale.objects.filter(pk__in=Sale.objects.order_by('pk').values('pk')[:2]).update(sale_date=old)
+        InventoryAudit.objects.filter(
+            pk__in=InventoryAudit.objects.order_by('pk').values('pk')[:2]
+        ).update(timestamp=old)
+        self.cutoff = (timezone.now() - timedelta(days=30)).date()
+
+    def test_archive_to_tables(self):
+        call_command('archive_history', before=self.cutoff.isoformat(), chunk_size=1, stdout=io.StringIO())
+        self.assertEqual((Sale.objects.count(), SaleArchive.objects.count()), (1, 2))
+        self.assertEqual((InventoryAudit.objects.count(), InventoryAuditArchive.objects.count()), (1, 2))
+        rollup = DailyHistoryRollup.objects.get()
+        self.assertEqual((rollup.units_sold, rollup.sale_count, rollup.revenue), (4, 2, 100))
+        self.assertEqual((rollup.stock_changes, rollup.net_stock_change), (2, -4))
+
+    def test_audit_endpoint_archive_opt_in(self):
+        call_command('archive_history', before=self.cutoff.isoformat(), stdout=io.StringIO())
+        client = api_client(self.user)
+        self.assertEqual(len(client.get('/api/inventory-audit/').data), 1)
+
+        self.assertEqual(client.get('/api/inventory-audit/', {'include_archive': 'true'}).status_code, 400)
+        for since, until in [('2020-01-01', '2030-13-01'), ('2020-02-30T10:00', '2030-01-01')]:
+            response = client.get('/api/inventory-audit/', {'include_archive': '1', 'since': since, 'until': until})
+            self.assertEqual(response.status_code, 400)
+        window = {
+            'include_archive': 'true',
+            'since': (self.cutoff - timedelta(days=20)).isoformat(),
+            'until': (timezone.localdate() + timedelta(days=1)).isoformat(),
+        }
+        response = client.get('/api/inventory-audit/', window)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[-1]['variant_sku'], self.variant.sku)
+        response = client.get('/api/inventory-audit/', {**window, 'archive_limit': 1})
+        self.assertEqual(len(response.data), 2)
+
+        archived_id = InventoryAuditArchive.objects.values_list('pk', flat=True).first()
+        self.assertEqual(client.get(f'/api/inventory-audit/{archived_id}/').status_code, 404)
+        response = client.get(f'/api/inventory-audit/{archived_id}/', {'include_archive': 'true'})
+        self.assertEqual(response.data['id'], archived_id)
+
+    def test_forecast_unchanged_by_archiving(self):
+        def forecast():
+            recompute_forecasts(history_days=60, window=60, alpha=0.3)
+            return DemandForecast.objects.values_list('moving_average', 'smoothed').get()
+
+        before = forecast()
+        self.assertGreater(before[0], 0)
+        call_command('archive_history', before=self.cutoff.isoformat(), stdout=io.StringIO())
+        self.assertEqual(Sale.objects.count(), 1)
+        after = forecast()
+        self.assertAlmostEqual(after[0], before[0])
+        self.assertAlmostEqual(after[1], before[1])
+
+    def test_archive_paging_keeps_rows_sharing_a_timestamp(self):
+        variants = [make_variant(self.user, 'Belt', color, color) for color in ('Tan', 'Red', 'Oxblood', 'Navy', 'Grey')]
+        Variant.objects.filter(pk__in=[v.pk for v in variants]).adjust_stock(3, user=self.user)
+        InventoryAudit.objects.filter(variant__in=variants).update(
+            timestamp=cutoff_datetime(self.cutoff) - timedelta(days=5)
+        )
+        archive_audits(self.cutoff)
+        client = api_client(self.user)
+        params = {
+            'include_archive': 'true',
+            'since': (self.cutoff - timedelta(days=6)).isoformat(),
+            'until': self.cutoff.isoformat(),
+            'archive_limit': 2,
+        }
+        seen = []
+        while True:
+            page = client.get('/api/inventory-audit/', params).data
+            if not page:
+                break
+            seen += [row['id'] for row in page]
+            params.update(until=page[-1]['timestamp'], until_id=page[-1]['id'])
+        self.assertEqual(sorted(seen), sorted(InventoryAuditArchive.objects.filter(
+            variant__in=variants).values_list('pk', flat=True)))
+        self.assertEqual(len(seen), 5)
+
+    def test_archived_sales_protect_variant(self):
+        archive_sales(self.cutoff)
+        Sale.objects.all().delete()
+        with self.assertRaises(ProtectedError):
+            self.variant.delete()
+        self.assertTrue(Variant.objects.filter(pk=self.variant.pk).exists())
+
+    def test_archived_sales_in_files_protect_variant(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_sales(self.cutoff, output_dir=tmp)
+        Sale.objects.all().delete()
+        with self.assertRaises(ProtectedError):
+            self.variant.delete()
+
+    def test_archived_audits_cascade_with_variant(self):
+        Sale.objects.all().delete()
+        archive_audits(self.cutoff)
+        self.assertTrue(InventoryAuditArchive.objects.exists())
+        self.variant.delete()
+        self.assertFalse(InventoryAuditArchive.objects.exists())
+        self.assertFalse(DailyHistoryRollup.objects.exists())
+
+    def test_archive_to_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(archive_sales(self.cutoff, output_dir=tmp), 2)
+            self.assertEqual(len(list(Path(tmp, 'sale').glob('*.csv.gz'))), 1)
+        self.assertFalse(SaleArchive.objects.exists())
@@ -0,0 +1,22 @@
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import ScopedRateThrottle
+
+from .coalescing import metrics
+
+
+class HotReadThrottle(ScopedRateThrottle):
+    """
+    Per-user, per-endpoint rate limit for read requests, kept in the
+    dedicated ``throttle`` cache. Rates come from DEFAULT_THROTTLE_RATES
+    keyed by the view's ``throttle_scope``.
+    """
+    cache = caches['throttle']
+
+    def allow_request(self, request, view):
+        if request.method not in SAFE_METHODS:
+            return True
+        allowed = super().allow_request(request, view)
+        if not allowed:
+            metrics.incr(self.scope, 'throttled')
+        return allowed
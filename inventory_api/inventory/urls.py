@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, ProductViewSet, VariantViewSet,
-    InventoryAuditViewSet, SaleViewSet, OrderViewSet
+    InventoryAuditViewSet, SaleViewSet, OrderViewSet, SearchView,
+    HotReadMetricsView
 )
 
 router = DefaultRouter()
@@ -14,5 +15,7 @@ router.register(r'sales', SaleViewSet, basename='register')
 router.register(r'orders', OrderViewSet, basename='orders')
 
 urlpatterns = [
+    path('search/', SearchView.as_view(), name='search'),
+    path('metrics/hot-reads/', HotReadMetricsView.as_view(), name='hot-read-metrics'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
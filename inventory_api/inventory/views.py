@@ -2,18 +2,33 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
 from rest_framework import generics, permissions
 from .serializers import SignupSerializer
-from .models import Category, Product, Variant, InventoryAudit, Sale, Order
+from .models import (
+    Category, Product, Variant, InventoryAudit, Sale, Order, SearchDocument, DemandForecast,
+    InventoryAuditArchive
+)
+from .search import facet_counts, match_documents
+from .coalescing import CoalescedReadMixin, metrics
+from .throttling import HotReadThrottle
 from .serializers import (
     CategorySerializer, ProductSerializer, VariantSerializer,
-    InventoryAuditSerializer, SaleSerializer, OrderSerializer
+    InventoryAuditSerializer, SaleSerializer, OrderSerializer, DemandForecastSerializer,
+    InventoryAuditArchiveSerializer
 )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    throttle_classes = [HotReadThrottle]
+    throttle_scope = 'categories'
+    coalesce_per_user = False
 
 class ProductViewSet(viewsets.ModelViewSet):
     serializer_class = ProductSerializer
@@ -25,9 +40,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class VariantViewSet(viewsets.ModelViewSet):
+class VariantViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
     serializer_class = VariantSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [HotReadThrottle]
+    throttle_scope = 'variants'
+    coalesce_per_user = True
 
     def get_queryset(self):
         product_id = self.request.query_params.get('product_id')
@@ -57,15 +75,144 @@ class VariantViewSet(viewsets.ModelViewSet):
         
         return Response(VariantSerializer(variant).data)
 
+    @action(detail=True, methods=['get'])
+    def forecast(self, request, pk=None):
+        variant = self.get_object()
+        forecast = get_object_or_404(DemandForecast.objects.select_related('variant'), variant=variant)
+        return Response(DemandForecastSerializer(forecast).data)
+
+class SearchView(generics.GenericAPIView):
+    """Full-text product/variant search with facet counts"""
+    serializer_class = VariantSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 200
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = SearchDocument.objects.filter(variant__product__user=self.request.user)
+        if params.get('category'):
+            queryset = queryset.filter(variant__product__category_id=params['category'])
+        if params.get('color'):
+            queryset = queryset.filter(variant__color=params['color'])
+        if params.get('size'):
+            queryset = queryset.filter(variant__size=params['size'])
+        in_stock = params.get('in_stock')
+        if in_stock in ('true', '1'):
+            queryset = queryset.filter(variant__stock_quantity__gt=0)
+        elif in_stock in ('false', '0'):
+            queryset = queryset.filter(variant__stock_quantity__lte=0)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = max(0, min(int(request.query_params.get('limit', 50)), self.max_limit))
+        except ValueError:
+            return Response({'error': 'Limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        category = request.query_params.get('category')
+        if category and not category.isdecimal():
+            return Response({'error': 'Category must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        documents = self.get_queryset()
+        text = request.query_params.get('q', '')
+        count, facets = facet_counts(match_documents(documents, text))
+        ranked_ids = list(match_documents(documents, text, ranked=True).values_list(
+            'variant_id', flat=True
+        )[:limit])
+        found = Variant.objects.select_related('product').in_bulk(ranked_ids)
+        variants = [found[pk] for pk in ranked_ids]
+        return Response({
+            'count': count,
+            'facets': facets,
+            'results': self.get_serializer(variants, many=True).data,
+        })
+
 class InventoryAuditViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = InventoryAuditSerializer
     permission_classes = [permissions.IsAuthenticated]
+    max_archive_rows = 1000
 
-    def get_queryset(self):
+    def get_queryset(self, model=InventoryAudit):
         variant_id = self.request.query_params.get('variant_id')
         if variant_id:
-            return InventoryAudit.objects.filter(variant_id=variant_id)
-        return InventoryAudit.objects.filter(variant__product__user=self.request.user)
+            queryset = model.objects.filter(variant_id=variant_id)
+        else:
+            queryset = model.objects.filter(variant__product__user=self.request.user)
+        return queryset.select_related('variant', 'user')
+
+    def _include_archive(self):
+        return self.request.query_params.get('include_archive') in ('true', '1')
+
+    def _archive_window(self):
+        """
+        Parse the ``since``/``until`` bounds (dates or datetimes, ``until``
+        exclusive) that the include_archive path requires. Returns None if
+        either is missing or invalid.
+        """
+        bounds = []
+        for name in ('since', 'until'):
+            value = self.request.query_params.get(name, '')
+            try:
+                # Well-formed but impossible values (month 13) raise ValueError
+                moment = parse_datetime(value)
+                day = parse_date(value) if moment is None else None
+            except ValueError:
+                return None
+            if moment is None:
+                if day is None:
+                    return None
+                moment = datetime.combine(day, time.min)
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            bounds.append(moment)
+        since, until = bounds
+        return (since, until) if since < until else None
+
+    def list(self, request, *args, **kwargs):
+        if not self._include_archive():
+            return super().list(request, *args, **kwargs)
+
+        window = self._archive_window()
+        if window is None:
+            return Response(
+                {'error': 'include_archive requires since and until dates, since before until'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = max(1, min(int(request.query_params.get('archive_limit', self.max_archive_rows)),
+                               self.max_archive_rows))
+            until_id = request.query_params.get('until_id')
+            until_id = int(until_id) if until_id else None
+        except ValueError:
+            return Response(
+                {'error': 'archive_limit and until_id must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        since, until = window
+        # Rows are ordered by (-timestamp, -id). Timestamps are not unique, so
+        # the next page starts below the last row's (timestamp, id): pass them
+        # as ``until`` and ``until_id``.
+        before = Q(timestamp__lt=until)
+        if until_id is not None:
+            before |= Q(timestamp=until, id__lt=until_id)
+        hot = self.get_queryset().filter(before, timestamp__gte=since).order_by('-timestamp', '-id')
+        # Archived rows all predate the hot table, so appending keeps the order
+        archived = self.get_queryset(model=InventoryAuditArchive).filter(
+            before, timestamp__gte=since
+        ).order_by('-timestamp', '-id')[:limit]
+        return Response(
+            self.get_serializer(hot, many=True).data
+            + InventoryAuditArchiveSerializer(archived, many=True).data
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not self._include_archive():
+                raise
+        archived = get_object_or_404(self.get_queryset(model=InventoryAuditArchive), pk=kwargs['pk'])
+        return Response(InventoryAuditArchiveSerializer(archived).data)
 
 class SaleViewSet(viewsets.ModelViewSet):
     serializer_class = SaleSerializer
@@ -103,6 +250,13 @@ class OrderViewSet(viewsets.ModelViewSet):
         order.save()
         return Response(OrderSerializer(order).data)
     
+class HotReadMetricsView(generics.GenericAPIView):
+    """Coalesced/throttled request counters for this process"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.snapshot())
+
 class SignupView(generics.CreateAPIView):
     serializer_class = SignupSerializer
     permission_classes = [permissions.AllowAny]  # Allow anyone to sign up